@@ -9,7 +9,14 @@ import time
 import subprocess
 import logging
 import os
+import functools
 import json
+import re
+import select
+import selectors
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
 # Add this at the top of your script
 try:
     import requests
@@ -19,8 +26,28 @@ except ImportError:
     print("Installing missing 'requests' module...")
     subprocess.check_call([sys.executable, "-m", "pip", "install", "requests"])
     import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 
+# Fast JSON encoding/decoding (optional, falls back to the json module)
+try:
+    import orjson
+    json_dumps, json_loads = orjson.dumps, orjson.loads
+except ImportError:
+    json_dumps, json_loads = json.dumps, json.loads
+
+# Native macOS APIs via PyObjC (optional, falls back to osascript)
+try:
+    from AppKit import NSWorkspace, NSWorkspaceApplicationKey, NSWorkspaceDidActivateApplicationNotification
+    from Foundation import NSDate, NSDefaultRunLoopMode, NSRunLoop
+    from CoreFoundation import (
+        CFFileDescriptorCreate, CFFileDescriptorCreateRunLoopSource, CFFileDescriptorEnableCallBacks,
+        CFRunLoopAddSource, CFRunLoopGetCurrent, kCFFileDescriptorReadCallBack, kCFRunLoopDefaultMode
+    )
+except ImportError:
+    NSWorkspace = None
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -32,19 +59,76 @@ logger = logging.getLogger("CodingMonitor")
 # Configuration file path
 CONFIG_FILE = os.path.join(os.path.expanduser("~"), ".coding_monitor.json")
 
+# Terminal status line (extra space at the end overwrites previous output)
+STATUS_LINE_TEMPLATE = "\rApp: {app:<25.25} | Coding: {coding} | Session: {session} | Total: {total} | Deep Mode: {deep}" + " " * 10
+
+# Redraw an unchanged status line at most this often
+STATUS_REFRESH_SECONDS = 5
+
+# Connect/read timeout for each Slack API attempt (a call retries at most once)
+SLACK_TIMEOUT_SECONDS = 5
+
+# Backoff between deep mode attempts after Slack failures (doubles up to the max)
+DEEP_MODE_RETRY_INITIAL_SECONDS = 10
+DEEP_MODE_RETRY_MAX_SECONDS = 300
+
+# Refresh Slack status/DND only once they are this close to expiring
+DEEP_MODE_REFRESH_BUFFER_SECONDS = 300
+
+# AppleScript used to query the frontmost app when NSWorkspace is unavailable
+FRONTMOST_APP_SCRIPT = 'tell application "System Events" to get name of first application process whose frontmost is true'
+
+# Longest wait for the osascript helper to answer a poll
+OSA_REPLY_TIMEOUT_SECONDS = 1
+
 class CodingTimeMonitor:
     def __init__(self):
         # Initialize state variables
         self.current_app = ""
-        self.app_start_time = None
-        self.continuous_coding_time = 0
-        self.total_coding_time = 0
+        self.session_start = None  # Monotonic start of the current coding session
+        self.threshold_logged = False  # Deep mode threshold logged in this session
+        self.total_coding_time = 0  # Coding time of finished sessions
         self.deep_mode_active = False
+        self.deep_mode_expiry = 0  # Wall clock time the Slack status/DND run out
         self.last_status_update = 0
+        self.last_status = None
+        
+        # Slack requests run on worker threads so they never stall the loop
+        self.slack_pool = ThreadPoolExecutor(max_workers=2)
+        self.slack_futures = []
+        self.slack_remaining = 0
+        self.slack_batch_ok = False
+        self.slack_batch_expiry = 0
+        self.slack_lock = threading.Lock()
+        self.deep_mode_retry_after = 0.0
+        self.deep_mode_backoff = DEEP_MODE_RETRY_INITIAL_SECONDS
+        
+        # Self-pipe that wakes wait() early (signals, finished Slack requests)
+        self.wake_r, self.wake_w = os.pipe()
+        os.set_blocking(self.wake_r, False)
+        os.set_blocking(self.wake_w, False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.wake_r, selectors.EVENT_READ)
+        
+        # Frontmost app tracking: pushed by NSWorkspace if available, otherwise
+        # queried through a long-lived osascript helper
+        self.osa = None
+        self.use_osa_helper = True
+        self.osa_buffer = b""
+        self.frontmost_app = None
+        self.app_changed = True
+        if NSWorkspace is not None:
+            self.watch_frontmost_app()
+            self.watch_wake_pipe()
+        else:
+            self.osa = self.start_osa()
         
         # Load configuration
         self.config = self.load_config()
         
+        # Keep-alive HTTPS session for Slack (reuses the TLS connection)
+        self.http = self.create_http_session()
+        
         # Print startup information
         logger.info("Starting Coding Time Monitor for Intel Mac (x86_64)")
         logger.info(f"Monitoring for apps: {', '.join(self.config['coding_apps'])}")
@@ -68,47 +152,237 @@ class CodingTimeMonitor:
         
         # Create default config if file doesn't exist
         if not os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'w') as f:
+            # Write to a temp file and rename, so a crash never leaves a partial config
+            tmp_file = CONFIG_FILE + ".tmp"
+            with open(tmp_file, 'w') as f:
                 json.dump(default_config, f, indent=2)
+            os.replace(tmp_file, CONFIG_FILE)
             logger.info(f"Created default configuration at {CONFIG_FILE}")
-            return default_config
+            config = default_config
+        else:
+            # Load existing config
+            try:
+                with open(CONFIG_FILE, 'rb') as f:
+                    config = json_loads(f.read())
+                logger.info(f"Loaded configuration from {CONFIG_FILE}")
+            except Exception as e:
+                logger.error(f"Error loading config: {e}, using defaults")
+                config = default_config
         
-        # Load existing config
+        # Precompile the coding app names into one lowercase pattern
+        # ("(?!)" never matches, for an empty app list)
+        pattern = "|".join(re.escape(app.lower()) for app in config['coding_apps'])
+        self.coding_apps_re = re.compile(pattern or "(?!)")
+        self.coding_app_cache = {}  # app name -> is coding app
+        return config
+    
+    def create_http_session(self):
+        """Create a persistent HTTP session for the Slack API"""
+        session = requests.Session()
+        session.headers.update({"Authorization": f"Bearer {self.config['slack_token']}"})
+        
+        # Retry a rate limit or transient server error once, without sleeping on
+        # Retry-After; longer outages are left to the deep mode backoff
+        retry = Retry(
+            total=1,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"]),  # Slack DND/status calls are idempotent
+            respect_retry_after_header=False
+        )
+        session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=retry))
+        return session
+    
+    def watch_frontmost_app(self):
+        """Subscribe to NSWorkspace app activation notifications"""
+        workspace = NSWorkspace.sharedWorkspace()
+        app = workspace.frontmostApplication()
+        self.frontmost_app = app.localizedName() if app is not None else None
+        self.app_observer = workspace.notificationCenter().addObserverForName_object_queue_usingBlock_(
+            NSWorkspaceDidActivateApplicationNotification, None, None, self.on_app_activated
+        )
+    
+    def watch_wake_pipe(self):
+        """Add the wake pipe to the Cocoa run loop so wake() also ends a run loop wait"""
+        def on_readable(fd_ref, callback_types, info):
+            pass  # Handling the source is enough to return from runMode_beforeDate_
+        
+        self.wake_fd_ref = CFFileDescriptorCreate(None, self.wake_r, False, on_readable, None)
+        CFFileDescriptorEnableCallBacks(self.wake_fd_ref, kCFFileDescriptorReadCallBack)
+        source = CFFileDescriptorCreateRunLoopSource(None, self.wake_fd_ref, 0)
+        CFRunLoopAddSource(CFRunLoopGetCurrent(), source, kCFRunLoopDefaultMode)
+    
+    def on_app_activated(self, notification):
+        """Record the newly activated app (called from the run loop)"""
+        app = notification.userInfo()[NSWorkspaceApplicationKey]
+        self.frontmost_app = app.localizedName()
+        self.app_changed = True
+    
+    def start_osa(self):
+        """Start an interactive osascript process that evaluates one script per line"""
         try:
-            with open(CONFIG_FILE, 'r') as f:
-                config = json.load(f)
-            logger.info(f"Loaded configuration from {CONFIG_FILE}")
-            return config
+            return subprocess.Popen(
+                ["osascript", "-i"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,  # Errors come back as a reply line
+                bufsize=0
+            )
         except Exception as e:
-            logger.error(f"Error loading config: {e}, using defaults")
-            return default_config
+            logger.error(f"Failed to start osascript helper: {e}")
+            return None
+    
+    def discard_osa_output(self):
+        """Drop pending helper output (prompts, late replies) so replies stay in step"""
+        fd = self.osa.stdout.fileno()
+        while select.select([fd], [], [], 0)[0]:
+            if not os.read(fd, 4096):
+                break
+        self.osa_buffer = b""
+    
+    def read_osa_reply(self, timeout):
+        """Read the helper's next reply line, or None on timeout or exit"""
+        fd = self.osa.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        while True:
+            while b"\n" in self.osa_buffer:
+                line, self.osa_buffer = self.osa_buffer.split(b"\n", 1)
+                line = line.decode('utf-8', 'replace').strip()
+                
+                # Interactive mode may echo a prompt and prefix results with "=>"
+                for prefix in (">>", "=>"):
+                    if line.startswith(prefix):
+                        line = line[len(prefix):].strip()
+                
+                # Skip blank lines and an echo of the script itself
+                if line and line != FRONTMOST_APP_SCRIPT:
+                    return line
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                return None
+            
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                return None  # Helper exited
+            self.osa_buffer += chunk
     
     def get_active_app(self):
-        """Get the currently active application using AppleScript"""
+        """Get the currently active application"""
+        if NSWorkspace is not None:
+            return self.frontmost_app or "Unknown"
+        
+        if not self.use_osa_helper:
+            return self.get_active_app_once()
+        
         try:
+            # Restart the helper if it has exited
+            if self.osa is None or self.osa.poll() is not None:
+                logger.warning("osascript helper not running, restarting")
+                self.osa = self.start_osa()
+                if self.osa is None:
+                    return self.get_active_app_once()
+            
             # Get application name (more reliable than window title)
-            cmd = "osascript -e 'tell application \"System Events\" to get name of first application process whose frontmost is true'"
-            process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            app_name, error = process.communicate()
+            self.discard_osa_output()
+            self.osa.stdin.write(FRONTMOST_APP_SCRIPT.encode('utf-8') + b"\n")
+            self.osa.stdin.flush()
+            app_name = self.read_osa_reply(OSA_REPLY_TIMEOUT_SECONDS)
             
-            if error:
-                logger.warning(f"Error getting app name: {error.decode('utf-8').strip()}")
+            # Never block the monitor on a stalled helper. No reply may also mean this
+            # osascript buffers its output, so use one-shot calls from now on, and keep
+            # the last known app so a slow reply doesn't end the coding session
+            if app_name is None:
+                logger.warning("No reply from osascript helper, switching to one-shot osascript calls")
+                self.osa.kill()
+                self.osa.wait()
+                self.use_osa_helper = False
+                return self.current_app or "Unknown"
+            
+            if "execution error" in app_name or "syntax error" in app_name:
+                logger.warning(f"Error getting app name: {app_name}")
+                return "Unknown"
+            
+            return app_name.strip('"')
+        except Exception as e:
+            logger.error(f"Exception getting active app: {e}")
+            return "Unknown"
+    
+    def get_active_app_once(self):
+        """Get the active application with a single osascript call (no shell)"""
+        try:
+            result = subprocess.run(
+                ["osascript", "-e", FRONTMOST_APP_SCRIPT],
+                capture_output=True,
+                text=True,
+                timeout=1
+            )
+            
+            if result.returncode != 0:
+                logger.warning(f"Error getting app name: {result.stderr.strip()}")
                 return "Unknown"
             
-            return app_name.decode('utf-8').strip()
+            return result.stdout.strip()
+        except subprocess.TimeoutExpired:
+            logger.warning("osascript timed out, keeping the last known app")
+            return self.current_app or "Unknown"
         except Exception as e:
             logger.error(f"Exception getting active app: {e}")
             return "Unknown"
     
+    def wake(self):
+        """Wake the monitor loop from another thread"""
+        try:
+            os.write(self.wake_w, b"\0")
+        except BlockingIOError:
+            pass  # Pipe full, a wakeup is already pending
+    
+    def drain_wakeups(self):
+        """Discard pending wakeup bytes"""
+        try:
+            while os.read(self.wake_r, 512):
+                pass
+        except BlockingIOError:
+            pass
+    
+    def wait(self, seconds):
+        """Wait until the timeout, an app switch notification or a wakeup"""
+        if NSWorkspace is not None:
+            deadline = NSDate.dateWithTimeIntervalSinceNow_(seconds)
+            if NSRunLoop.currentRunLoop().runMode_beforeDate_(NSDefaultRunLoopMode, deadline):
+                self.drain_wakeups()
+                CFFileDescriptorEnableCallBacks(self.wake_fd_ref, kCFFileDescriptorReadCallBack)  # Callbacks are one-shot
+                return
+        
+        # No run loop: wait on the wake pipe
+        self.selector.select(seconds)
+        self.drain_wakeups()
+    
     def is_coding_app(self, app_name):
-        """Check if the application is a coding app"""
-        return any(app.lower() in app_name.lower() for app in self.config['coding_apps'])
+        """Check if the application is a coding app (cached per app name)"""
+        is_coding = self.coding_app_cache.get(app_name)
+        if is_coding is None:
+            is_coding = self.coding_apps_re.search(app_name.lower()) is not None
+            self.coding_app_cache[app_name] = is_coding
+        return is_coding
     
-    def format_time(self, seconds):
-        """Format seconds into HH:MM:SS"""
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def format_time(seconds):
+        """Format whole seconds into HH:MM:SS (memoized, pass an int)"""
         hours, remainder = divmod(seconds, 3600)
         minutes, seconds = divmod(remainder, 60)
-        return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    
+    def slack_error(self, response):
+        """Return the error from a Slack API response, or None if it succeeded"""
+        # Fast path: Slack's compact success body starts with "ok":true, no need to parse it
+        if response.status_code == 200 and response.content.startswith(b'{"ok":true'):
+            return None
+        
+        result = json_loads(response.content)
+        if result.get("ok"):
+            return None
+        return result.get('error', 'Unknown error')
     
     def set_slack_dnd(self):
         """Set Slack Do Not Disturb mode"""
@@ -119,21 +393,20 @@ class CodingTimeMonitor:
         try:
             url = "https://slack.com/api/dnd.setSnooze"
             headers = {
-                "Authorization": f"Bearer {self.config['slack_token']}",
                 "Content-Type": "application/x-www-form-urlencoded"
             }
             data = {
                 "num_minutes": self.config['dnd_duration_minutes']
             }
             
-            response = requests.post(url, headers=headers, data=data)
-            result = response.json()
+            response = self.http.post(url, headers=headers, data=data, timeout=SLACK_TIMEOUT_SECONDS)
+            error = self.slack_error(response)
             
-            if result.get("ok"):
+            if error is None:
                 logger.info(f"Set Slack DND mode for {self.config['dnd_duration_minutes']} minutes")
                 return True
             else:
-                logger.error(f"Failed to set Slack DND: {result.get('error', 'Unknown error')}")
+                logger.error(f"Failed to set Slack DND: {error}")
                 return False
                 
         except Exception as e:
@@ -149,7 +422,6 @@ class CodingTimeMonitor:
         try:
             url = "https://slack.com/api/users.profile.set"
             headers = {
-                "Authorization": f"Bearer {self.config['slack_token']}",
                 "Content-Type": "application/json; charset=utf-8"
             }
             
@@ -162,125 +434,192 @@ class CodingTimeMonitor:
                 }
             }
             
-            response = requests.post(url, headers=headers, data=json.dumps(data))
-            result = response.json()
+            response = self.http.post(url, headers=headers, data=json_dumps(data), timeout=SLACK_TIMEOUT_SECONDS)
+            error = self.slack_error(response)
             
-            if result.get("ok"):
+            if error is None:
                 logger.info("Set Slack status to 'Deep Coding Mode'")
                 return True
             else:
-                logger.error(f"Failed to set Slack status: {result.get('error', 'Unknown error')}")
+                logger.error(f"Failed to set Slack status: {error}")
                 return False
                 
         except Exception as e:
             logger.error(f"Error setting Slack status: {e}")
             return False
     
-    def enable_deep_mode(self):
-        """Enable Deep Coding Mode (DND + Status)"""
-        current_time = time.time()
+    def coding_time(self, now):
+        """Return (continuous, total) coding seconds at monotonic time now"""
+        if self.session_start is None:
+            return 0, self.total_coding_time
+        continuous = now - self.session_start
+        return continuous, self.total_coding_time + continuous
+    
+    def slack_pending(self):
+        """Check if Slack requests from the last attempt are still in flight"""
+        return any(not future.done() for future in self.slack_futures)
+    
+    def enable_deep_mode(self, now):
+        """Enable Deep Coding Mode (DND + Status) on background threads (now: monotonic time)"""
+        # Don't resubmit while a previous attempt is still in flight
+        if self.slack_pending():
+            return
         
-        # Only update if not already in deep mode or past update interval
-        if not self.deep_mode_active or (current_time - self.last_status_update > self.config['status_update_interval_seconds']):
+        # Only update if not already in deep mode, or once past the update interval
+        # when the status/DND set last time is about to expire
+        refresh_due = (now - self.last_status_update > self.config['status_update_interval_seconds']
+                       and self.deep_mode_expiry - time.time() <= DEEP_MODE_REFRESH_BUFFER_SECONDS)
+        if not self.deep_mode_active or refresh_due:
             logger.info("Enabling deep coding mode...")
             
-            # Set DND mode
-            dnd_success = self.set_slack_dnd()
+            # Set optimistically so the next poll doesn't submit again
+            self.last_status_update = now
             
-            # Set status
-            status_success = self.set_slack_status()
+            # No new attempt before the backoff, even if the callbacks haven't run yet
+            self.deep_mode_retry_after = now + self.deep_mode_backoff
             
-            if dnd_success or status_success:
-                self.deep_mode_active = True
-                self.last_status_update = current_time
-                logger.info(f"Deep coding mode active for {self.config['dnd_duration_minutes']} minutes")
-                return True
-            else:
-                logger.warning("Failed to enable deep coding mode")
-                return False
+            # Set DND mode and status
+            self.slack_remaining = 2
+            self.slack_batch_ok = False
+            self.slack_batch_expiry = int(time.time()) + (self.config['dnd_duration_minutes'] * 60)
+            self.slack_futures = [
+                self.slack_pool.submit(self.set_slack_dnd),
+                self.slack_pool.submit(self.set_slack_status)
+            ]
+            for future in self.slack_futures:
+                future.add_done_callback(self.on_slack_update_done)
+    
+    def on_slack_update_done(self, future):
+        """Update deep mode state when a Slack request finishes (worker thread)"""
+        with self.slack_lock:
+            self.slack_remaining -= 1
+            if future.result():
+                self.slack_batch_ok = True
+                self.deep_mode_expiry = self.slack_batch_expiry
+                self.deep_mode_backoff = DEEP_MODE_RETRY_INITIAL_SECONDS
+                self.deep_mode_retry_after = 0.0  # A refresh may follow without waiting out the backoff
+                if not self.deep_mode_active:
+                    self.deep_mode_active = True
+                    logger.info(f"Deep coding mode active for {self.config['dnd_duration_minutes']} minutes")
+            elif self.slack_remaining == 0 and not self.slack_batch_ok:
+                # Both requests failed: back off instead of retrying on the next tick
+                self.deep_mode_retry_after = time.monotonic() + self.deep_mode_backoff
+                logger.warning(f"Failed to enable deep coding mode, retrying in {self.deep_mode_backoff} seconds")
+                self.deep_mode_backoff = min(self.deep_mode_backoff * 2, DEEP_MODE_RETRY_MAX_SECONDS)
         
-        return True  # Already in deep mode
+        # Let the loop redraw the status and reschedule right away
+        self.wake()
     
     def start_monitoring(self):
         """Main monitoring loop"""
         logger.info("Starting monitoring. Press Ctrl+C to exit.")
-        last_app_check = time.time()
-        last_status_print = time.time()
+        last_app_check = 0
+        last_status_redraw = 0
+        
+        # Signals (Ctrl+C) write to the wake pipe so they end a wait immediately
+        signal.set_wakeup_fd(self.wake_w)
         
         try:
             while True:
-                current_time = time.time()
+                # One monotonic clock reading per iteration (immune to wall clock jumps)
+                now = time.monotonic()
                 
-                # Check active app (at configured interval)
-                if current_time - last_app_check >= self.config['check_interval_seconds']:
+                # Check active app (on app switch notifications, or at configured interval)
+                if NSWorkspace is not None:
+                    check_app = self.app_changed
+                else:
+                    check_app = now - last_app_check >= self.config['check_interval_seconds']
+                
+                if check_app:
+                    self.app_changed = False
                     app_name = self.get_active_app()
                     is_coding = self.is_coding_app(app_name)
-                    last_app_check = current_time
+                    last_app_check = now
                     
                     # Update times
                     if is_coding:
                         # If app changed but still coding
                         if self.current_app != app_name:
-                            # Add time from previous coding app
-                            if self.app_start_time is not None and self.is_coding_app(self.current_app):
-                                session_time = current_time - self.app_start_time
-                                self.total_coding_time += session_time
+                            if self.session_start is not None:
                                 logger.debug(f"App change: {self.current_app} → {app_name}")
                             
-                            # Reset session with new app
+                            # Continue the session in the new app
                             self.current_app = app_name
-                            self.app_start_time = current_time
                             
                             # Log if starting new coding session
-                            if self.continuous_coding_time == 0:
+                            if self.session_start is None:
+                                self.session_start = now
+                                self.threshold_logged = False
                                 logger.info(f"Started coding session in {app_name}")
-                        
-                        # Increment continuous coding time
-                        self.continuous_coding_time += self.config['check_interval_seconds']
-                        
-                        # Check if we should enable deep mode
-                        if self.continuous_coding_time >= self.config['deep_mode_threshold_seconds'] and not self.deep_mode_active:
-                            logger.info(f"Reached deep mode threshold: {self.format_time(self.continuous_coding_time)}")
-                            self.enable_deep_mode()
                     else:
                         # No longer coding
-                        if self.continuous_coding_time > 0:
+                        if self.session_start is not None:
                             # End of coding session
-                            logger.info(f"Coding session ended. Duration: {self.format_time(self.continuous_coding_time)}")
+                            duration = now - self.session_start
+                            logger.info(f"Coding session ended. Duration: {self.format_time(int(duration))}")
                             
                             # Add to total time
-                            if self.app_start_time is not None:
-                                session_time = current_time - self.app_start_time
-                                self.total_coding_time += session_time
-                                self.app_start_time = None
-                            
-                            self.continuous_coding_time = 0
+                            self.total_coding_time += duration
+                            self.session_start = None
                         
                         self.current_app = app_name
                 
-                # Print status (once per second)
-                if current_time - last_status_print >= 1:
-                    status_line = f"\rApp: {self.current_app[:25]:<25} | "
-                    status_line += f"Coding: {'Yes' if (self.continuous_coding_time > 0) else 'No'} | "
-                    status_line += f"Session: {self.format_time(self.continuous_coding_time)} | "
-                    status_line += f"Total: {self.format_time(self.total_coding_time)} | "
-                    status_line += f"Deep Mode: {'Active' if self.deep_mode_active else 'Inactive'}"
-                    status_line += " " * 10  # Extra space to overwrite previous output
-                    
-                    print(status_line, end="")
-                    last_status_print = current_time
+                # Coding times are derived from the session start, not accumulated per iteration
+                coding = self.session_start is not None
+                continuous, total = self.coding_time(now)
+                
+                # Enable (or refresh) deep mode, not while a previous attempt is
+                # still in flight, or backing off after a failure
+                if (coding and not self.slack_pending()
+                        and continuous >= self.config['deep_mode_threshold_seconds']
+                        and now >= self.deep_mode_retry_after):
+                    # Log the crossing once, not on every backoff retry
+                    if not self.deep_mode_active and not self.threshold_logged:
+                        logger.info(f"Reached deep mode threshold: {self.format_time(int(continuous))}")
+                        self.threshold_logged = True
+                    self.enable_deep_mode(now)
+                
+                # Print status when it changed (and periodically, to repaint after log output)
+                session_seconds = int(continuous)
+                total_seconds = int(total)
+                status = (self.current_app, coding, session_seconds, total_seconds, self.deep_mode_active)
+                
+                if status != self.last_status or now - last_status_redraw >= STATUS_REFRESH_SECONDS:
+                    print(STATUS_LINE_TEMPLATE.format(
+                        app=self.current_app,
+                        coding='Yes' if coding else 'No',
+                        session=self.format_time(session_seconds),
+                        total=self.format_time(total_seconds),
+                        deep='Active' if self.deep_mode_active else 'Inactive'
+                    ), end="")
+                    self.last_status = status
+                    last_status_redraw = now
                 
-                # Small sleep to prevent CPU spike
-                time.sleep(0.1)
+                # Sleep until the next status change, deep mode threshold or app poll;
+                # with NSWorkspace an app switch also ends the wait
+                next_event = last_status_redraw + STATUS_REFRESH_SECONDS
+                if coding:
+                    next_event = min(next_event, self.session_start + session_seconds + 1)
+                    if not self.deep_mode_active and not self.slack_pending():
+                        threshold_at = self.session_start + self.config['deep_mode_threshold_seconds']
+                        next_event = min(next_event, max(threshold_at, self.deep_mode_retry_after))
+                if NSWorkspace is None:
+                    next_event = min(next_event, last_app_check + self.config['check_interval_seconds'])
+                self.wait(max(0, next_event - now))
                 
         except KeyboardInterrupt:
             # Clean exit on Ctrl+C
             print("\nMonitoring stopped.")
-            logger.info(f"Monitoring stopped. Total coding time: {self.format_time(self.total_coding_time)}")
+            total = self.coding_time(time.monotonic())[1]
+            logger.info(f"Monitoring stopped. Total coding time: {self.format_time(int(total))}")
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
             import traceback
             traceback.print_exc()
+        finally:
+            signal.set_wakeup_fd(-1)
+            self.slack_pool.shutdown(wait=False)
+            self.http.close()
 
 
 if __name__ == "__main__":